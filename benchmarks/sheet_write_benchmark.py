@@ -0,0 +1,108 @@
+"""Compares the set_dataframe and pasteData write paths at several row counts.
+
+By default only client-side encoding is measured: the request body each path would send is built and
+JSON encoded, and its size and build time are reported. Pass --sheet-id (with CREDENTIALS_FILE set) to
+also time real writes to a scratch worksheet that is deleted afterwards and check that both paths wrote
+the same cells. Run from the repo root:
+
+    python -m benchmarks.sheet_write_benchmark --rows 100 1000 5000 --sheet-id <id>
+"""
+import argparse
+import json
+import os
+from time import perf_counter
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from utils.sheet_writer import NAN_VALUE, build_paste_requests, paste_dataframe
+
+# Roughly the shape of the SLA_data_source union: ~30 columns of text, dates and flags
+TEXT_COLUMNS = 18
+DATE_COLUMNS = 6
+FLAG_COLUMNS = 6
+
+BENCHMARK_SHEET_TITLE = "write_benchmark"
+
+# Quoted text pasteData could unquote or run into the next cells if sent as is; written into the first row
+QUOTED_CELLS = ['"JJ" Lee', 'said "hi" then left', '"']
+
+
+def _make_frame(row_count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(TEXT_COLUMNS):
+        data[f"text_{i}"] = [f"value {n} of column {i}" for n in rng.integers(0, 10_000, row_count)]
+    for i in range(DATE_COLUMNS):
+        data[f"date_{i}"] = pd.Timestamp("2024-07-01") + pd.to_timedelta(rng.integers(0, 365, row_count), unit="D")
+    for i in range(FLAG_COLUMNS):
+        data[f"flag_{i}"] = rng.integers(0, 2, row_count)
+    df = pd.DataFrame(data)
+    if row_count:
+        for i, cell in enumerate(QUOTED_CELLS):
+            df.loc[0, f"text_{i}"] = cell
+    return df
+
+
+def _values_body(df: pd.DataFrame) -> str:
+    """Mirrors how Worksheet.set_dataframe builds its values.batchUpdate body"""
+    values = df.fillna(NAN_VALUE).astype("unicode").values.tolist()
+    values.insert(0, df.columns.tolist())
+    body = {
+        "valueInputOption": "USER_ENTERED",
+        "data": [{"range": "A1", "majorDimension": "ROWS", "values": values}],
+    }
+    return json.dumps(body)
+
+
+def _paste_body(df: pd.DataFrame) -> str:
+    return json.dumps({"requests": build_paste_requests(0, df, (1, 1))})
+
+
+def _time(func, *args) -> float:
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def _run_live(sheet_id: str, frames: List[pd.DataFrame]) -> None:
+    from pygsheets import authorize
+
+    spreadsheet = authorize(service_file=os.getenv("CREDENTIALS_FILE")).open_by_key(sheet_id)
+    worksheet = spreadsheet.add_worksheet(BENCHMARK_SHEET_TITLE, rows=100, cols=len(frames[0].columns))
+    try:
+        print(f"\n{'rows':>8} {'set_dataframe s':>16} {'pasteData s':>12} {'same cells':>11}")
+        for df in frames:
+            worksheet.clear()
+            values_seconds = _time(worksheet.set_dataframe, df, "A1")
+            values_cells = worksheet.get_all_values(include_tailing_empty=False, include_tailing_empty_rows=False)
+            worksheet.clear()
+            paste_seconds = _time(paste_dataframe, worksheet, df, "A1")
+            paste_cells = worksheet.get_all_values(include_tailing_empty=False, include_tailing_empty_rows=False)
+            print(f"{len(df):>8} {values_seconds:>16.2f} {paste_seconds:>12.2f} {str(values_cells == paste_cells):>11}")
+    finally:
+        spreadsheet.del_worksheet(worksheet)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--sheet-id", dest="sheet_id", help="Spreadsheet to time real writes against")
+    args = parser.parse_args()
+
+    frames = [_make_frame(row_count) for row_count in args.rows]
+
+    print(f"{'rows':>8} {'values bytes':>14} {'paste bytes':>14} {'values ms':>10} {'paste ms':>10}")
+    for df in frames:
+        values_ms = _time(_values_body, df) * 1000
+        paste_ms = _time(_paste_body, df) * 1000
+        print(f"{len(df):>8} {len(_values_body(df).encode()):>14,} {len(_paste_body(df).encode()):>14,} "
+              f"{values_ms:>10.1f} {paste_ms:>10.1f}")
+
+    if args.sheet_id:
+        _run_live(args.sheet_id, frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from datetime import date, datetime
 import logging
 import os
-from typing import Union
+from typing import Set, Tuple, Union
 from zoneinfo import ZoneInfo
 
 from gbq_connector import BigQueryClient
@@ -9,6 +9,11 @@ import numpy as np
 import pandas as pd
 from pygsheets import Spreadsheet, Worksheet
 
+from utils.cleared_id_cache import get_cleared_ids, update_cleared_ids_cache
+from utils.run_lock import get_as_df_with_checksum, is_range_unchanged
+from utils.sheet_writer import write_dataframe
+from utils.write_modes import DEFAULT_WRITE_MODE
+
 logger = logging.getLogger(__name__)
 
 # Tech Tracker Cell References for offboarding
@@ -38,7 +43,7 @@ REPORT_COLUMN_RENAME_MAP = {
 }
 
 
-def _removed_offboarders_from_cleared_sheet(tracker: Spreadsheet) -> None:
+def _removed_offboarders_from_cleared_sheet(tracker: Spreadsheet, write_mode: str) -> None:
     cleared_sheet = tracker.worksheet_by_title(f"Offboarding - Cleared")
 
     # Get cleared sheet data
@@ -62,7 +67,11 @@ def _removed_offboarders_from_cleared_sheet(tracker: Spreadsheet) -> None:
         cleared_sheet.clear(start=(TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL))
 
         # Insert cleared onboarders back into cleared tracker sheet
-        cleared_sheet.set_dataframe(cleared_sheet_df, (TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL), copy_head=False)
+        write_dataframe(cleared_sheet, cleared_sheet_df, (TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL),
+                        copy_head=False, write_mode=write_mode)
+
+        # The ID column is the first column read from the Cleared sheet
+        update_cleared_ids_cache(cleared_sheet, cleared_sheet_df.iloc[:, 0].tolist())
     else:
         logger.info("Tech Tracker sheet 'Offboarding - Cleared' is empty")
 
@@ -74,14 +83,8 @@ def _create_tracker_updated_timestamp(tracker_worksheet: Worksheet) -> None:
     tracker_worksheet.update_value(TECH_TIMESTAMP_CELL_REF, f"LAST UPDATED: {d_stamp} @ {t_stamp}")
 
 
-def _filter_out_cleared_offboarders(cleared_ids_df: pd.DataFrame, tech_tracker_df: pd.DataFrame) -> pd.DataFrame:
-    result = pd.merge(
-        tech_tracker_df,
-        cleared_ids_df,
-        indicator=True,
-        how="outer",
-        on=["account_id"]).query("_merge=='left_only'")
-    return result.drop(["_merge"], axis=1)
+def _filter_out_cleared_offboarders(cleared_ids: Set[str], tech_tracker_df: pd.DataFrame) -> pd.DataFrame:
+    return tech_tracker_df[~tech_tracker_df["account_id"].isin(cleared_ids)]
 
 
 def _get_and_prep_datasource(bq_conn) -> pd.DataFrame:
@@ -95,29 +98,27 @@ def _get_and_prep_datasource(bq_conn) -> pd.DataFrame:
     return refreshed_df
 
 
-def _get_and_prep_tracker_df(tracker_worksheet: Worksheet) -> pd.DataFrame:
+def _get_and_prep_tracker_df(tracker_worksheet: Worksheet) -> Tuple[pd.DataFrame, str]:
+    """Returns the tracker and the checksum of the range it was read from"""
     # Sort range first to eliminate possible blank rows
     tracker_worksheet.sort_range(
         start=(TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL),
         end=(tracker_worksheet.rows, tracker_worksheet.cols),
         basecolumnindex=15
     )
-    # -1 to include headers
-    df = tracker_worksheet.get_as_df(
-        has_header=True,
-        start=(TECH_TRACKER_HEADER_ROW, TECH_TRACKER_DATA_COL),
-        end=(tracker_worksheet.rows, TECH_TRACKER_COL_WIDTH),
-        include_tailing_empty=False
-    )
+    df, tracker_checksum = get_as_df_with_checksum(tracker_worksheet, *_get_tracker_range(tracker_worksheet))
     df = df.astype(str)
-    return df
+    return df, tracker_checksum
+
+
+def _get_tracker_range(tracker_worksheet: Worksheet) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """Range read by _get_and_prep_tracker_df, headers included"""
+    return (TECH_TRACKER_HEADER_ROW, TECH_TRACKER_DATA_COL), (tracker_worksheet.rows, TECH_TRACKER_COL_WIDTH)
 
 
-def _get_cleared_tech_ids(spreadsheet: Spreadsheet) -> pd.DataFrame:
+def _get_cleared_tech_ids(spreadsheet: Spreadsheet) -> Set[str]:
     cleared_sheet = spreadsheet.worksheet_by_title(f"Offboarding - Cleared")
-    cleared_sheet = cleared_sheet.get_as_df(has_header=True, start="B3", end=(cleared_sheet.rows, 2),
-                                   include_tailing_empty=False)
-    return cleared_sheet.astype(str)
+    return get_cleared_ids(cleared_sheet, TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL)
 
 
 def _get_new_records(tracker_df: pd.DataFrame, jobvite_df: pd.DataFrame) -> pd.DataFrame:
@@ -131,9 +132,10 @@ def _get_new_records(tracker_df: pd.DataFrame, jobvite_df: pd.DataFrame) -> pd.D
     return result.drop(["_merge"], axis=1)
 
 
-def _insert_updated_data_to_google_sheets(updated_tracker_df: pd.DataFrame, tech_tracker_sheet: Worksheet) -> None:
-    tech_tracker_sheet.set_dataframe(updated_tracker_df, (TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL),
-                                     copy_head=False)
+def _insert_updated_data_to_google_sheets(updated_tracker_df: pd.DataFrame, tech_tracker_sheet: Worksheet,
+                                          write_mode: str) -> None:
+    write_dataframe(tech_tracker_sheet, updated_tracker_df, (TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL),
+                    copy_head=False, write_mode=write_mode)
     sheet_dim = (tech_tracker_sheet.rows, tech_tracker_sheet.cols)
     tech_tracker_sheet.sort_range((TECH_TRACKER_DATA_ROW, TECH_TRACKER_DATA_COL), sheet_dim, basecolumnindex=18,
                                   sortorder="DESCENDING")
@@ -155,19 +157,19 @@ def _update_dataframe(stale_df: pd.DataFrame, current_data_df: pd.DataFrame) ->
     return df
 
 
-def refresh_offboarding_tracker(tech_tracker_spreadsheet: Spreadsheet) -> None:
+def refresh_offboarding_tracker(tech_tracker_spreadsheet: Spreadsheet, write_mode: str = DEFAULT_WRITE_MODE) -> None:
 
     tracker_name = "Offboarding Tracker"
     bq_conn = BigQueryClient()
     refreshed_df = _get_and_prep_datasource(bq_conn)
 
     tech_tracker_sheet = tech_tracker_spreadsheet.worksheet_by_title(tracker_name)
-    tracker_backup_df = _get_and_prep_tracker_df(tech_tracker_sheet)
+    tracker_backup_df, tracker_checksum = _get_and_prep_tracker_df(tech_tracker_sheet)
 
     # Tech Tracker has ability to clear onboarders who have completed onboarding to an archive sheet
     # The below filters those onboarders out of the Jobvite dataset
-    cleared_ids_df = _get_cleared_tech_ids(tech_tracker_spreadsheet)
-    refreshed_df = _filter_out_cleared_offboarders(cleared_ids_df, refreshed_df)
+    cleared_ids = _get_cleared_tech_ids(tech_tracker_spreadsheet)
+    refreshed_df = _filter_out_cleared_offboarders(cleared_ids, refreshed_df)
     logging.info(f"Found {len(refreshed_df)} records to add or update")
 
     updated_tracker_df = pd.DataFrame()
@@ -185,12 +187,17 @@ def refresh_offboarding_tracker(tech_tracker_spreadsheet: Spreadsheet) -> None:
     else:
         logging.info(f"No new records to add to tracker sheet {tracker_name}")
 
+    tracker_current = True
     if not updated_tracker_df.empty:
-        _insert_updated_data_to_google_sheets(updated_tracker_df, tech_tracker_sheet)
-        logger.info(f"Finished refreshing tracker sheet {tracker_name}")
+        tracker_current = is_range_unchanged(tech_tracker_sheet, *_get_tracker_range(tech_tracker_sheet),
+                                             tracker_checksum)
+        if tracker_current:
+            _insert_updated_data_to_google_sheets(updated_tracker_df, tech_tracker_sheet, write_mode)
+            logger.info(f"Finished refreshing tracker sheet {tracker_name}")
     else:
         logger.info(f"No updates found. Nothing to refresh in sheet {tracker_name}")
 
-    _removed_offboarders_from_cleared_sheet(tech_tracker_spreadsheet)
+    _removed_offboarders_from_cleared_sheet(tech_tracker_spreadsheet, write_mode)
 
-    _create_tracker_updated_timestamp(tech_tracker_sheet)
+    if tracker_current:
+        _create_tracker_updated_timestamp(tech_tracker_sheet)
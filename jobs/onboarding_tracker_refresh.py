@@ -1,7 +1,7 @@
 from datetime import date, datetime
 import logging
 import os
-from typing import Union
+from typing import Dict, Set, Tuple, Union
 from zoneinfo import ZoneInfo
 
 from gbq_connector import BigQueryClient
@@ -9,6 +9,12 @@ import numpy as np
 import pandas as pd
 from pygsheets import Spreadsheet, Worksheet
 
+from utils.checkpoint import is_stage_complete, load_stage, mark_run_complete, save_stage
+from utils.cleared_id_cache import get_cleared_ids
+from utils.run_lock import get_as_df_with_checksum, is_range_unchanged
+from utils.sheet_writer import write_dataframe
+from utils.write_modes import DEFAULT_WRITE_MODE
+
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,10 @@ TECH_TRACKER_BASE_COL = 2
 TECH_TRACKER_COL_WIDTH = 19
 TECH_TIMESTAMP_CELL_REF = "A2"
 
+# Tech Cleared Sheet Cell References
+CLEARED_SHEET_DATA_ROW = 5
+CLEARED_SHEET_ID_COL = 3
+
 # HR Tracker Cell References
 HR_TRACKER_BASE_ROW = 5
 HR_TRACKER_BASE_COL = 1
@@ -107,14 +117,8 @@ def _filter_candidates_for_school_year(jobvite_df: pd.DataFrame, school_year: st
     return jobvite_df
 
 
-def _filter_out_cleared_on_boarders(cleared_ids_df: pd.DataFrame, tech_tracker_df: pd.DataFrame) -> pd.DataFrame:
-    result = pd.merge(
-        tech_tracker_df,
-        cleared_ids_df,
-        indicator=True,
-        how="outer",
-        on=["job_candidate_id"]).query("_merge=='left_only'")
-    return result.drop(["_merge"], axis=1)
+def _filter_out_cleared_on_boarders(cleared_ids: Set[str], tech_tracker_df: pd.DataFrame) -> pd.DataFrame:
+    return tech_tracker_df[~tech_tracker_df["job_candidate_id"].astype(str).isin(cleared_ids)]
 
 
 def _get_and_prep_jobvite_data(bq_conn, dataset, year)  -> pd.DataFrame:
@@ -124,31 +128,31 @@ def _get_and_prep_jobvite_data(bq_conn, dataset, year)  -> pd.DataFrame:
     return jobvite_df.drop_duplicates(subset=["job_candidate_id"])
 
 
-def _get_and_prep_tracker_df(tracker_worksheet: Worksheet) -> pd.DataFrame:
+def _get_and_prep_tracker_df(tracker_worksheet: Worksheet) -> Tuple[pd.DataFrame, str]:
+    """Returns the tracker and the checksum of the range it was read from"""
     # Sort range first to eliminate possible blank rows
     tracker_worksheet.sort_range(
         start=(TECH_TRACKER_BASE_ROW, TECH_TRACKER_BASE_COL),
         end=(tracker_worksheet.rows, tracker_worksheet.cols),
         basecolumnindex=2
         )
-    # -1 to include headers
-    df = tracker_worksheet.get_as_df(
-        has_header=True,
-        start=(TECH_TRACKER_BASE_ROW -1, TECH_TRACKER_BASE_COL),
-        end=(tracker_worksheet.rows, TECH_TRACKER_COL_WIDTH),
-        include_tailing_empty=False
-        )
+    # Checksum taken after the sort so only edits made by others after the read are caught before writing
+    df, tracker_checksum = get_as_df_with_checksum(tracker_worksheet, *_get_tracker_range(tracker_worksheet))
     df.astype(str)
     df["Start Date - Last Updated"] = pd.to_datetime(df["Start Date - Last Updated"], format="%Y-%m-%d").dt.date
     df["Pay Location - Last Updated"] = pd.to_datetime(df["Pay Location - Last Updated"], format="%Y-%m-%d").dt.date
     df["Start Date"] = pd.to_datetime(df["Start Date"], format="%m/%d/%Y")
-    return df
+    return df, tracker_checksum
+
+
+def _get_tracker_range(tracker_worksheet: Worksheet) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """Range read by _get_and_prep_tracker_df, headers included"""
+    return (TECH_TRACKER_BASE_ROW - 1, TECH_TRACKER_BASE_COL), (tracker_worksheet.rows, TECH_TRACKER_COL_WIDTH)
 
 
-def _get_cleared_tech_ids(spreadsheet: Spreadsheet, year: str) -> pd.DataFrame:
+def _get_cleared_tech_ids(spreadsheet: Spreadsheet, year: str) -> Set[str]:
     cleared_sheet = spreadsheet.worksheet_by_title(f"{year} Cleared")
-    return cleared_sheet.get_as_df(has_header=True, start="C4", end=(cleared_sheet.rows, 3),
-                                   include_tailing_empty=False)
+    return get_cleared_ids(cleared_sheet, CLEARED_SHEET_DATA_ROW, CLEARED_SHEET_ID_COL)
 
 
 def _get_cleared_to_hire_data_from_hr_tracker(hr_worksheet: Worksheet) -> pd.DataFrame:
@@ -199,10 +203,10 @@ def _get_rescinded_offers(bq_conn: BigQueryClient, dataset: str) -> Union[list,
         return None
 
 
-def _insert_updated_data_to_google_sheets(updated_tracker_df: pd.DataFrame, tech_tracker_sheet: Worksheet) -> None:
-    tech_tracker_sheet.set_dataframe(updated_tracker_df, (TECH_TRACKER_BASE_ROW, TECH_TRACKER_BASE_COL), copy_head=False)
-    sheet_dim = (tech_tracker_sheet.rows, tech_tracker_sheet.cols)
-    tech_tracker_sheet.sort_range((TECH_TRACKER_BASE_ROW, TECH_TRACKER_BASE_COL), sheet_dim, basecolumnindex=18, sortorder="DESCENDING")
+def _insert_updated_data_to_google_sheets(updated_tracker_df: pd.DataFrame, tech_tracker_sheet: Worksheet,
+                                          write_mode: str) -> None:
+    write_dataframe(tech_tracker_sheet, updated_tracker_df, (TECH_TRACKER_BASE_ROW, TECH_TRACKER_BASE_COL),
+                    copy_head=False, write_mode=write_mode)
 
 
 def _merge_for_comparison(updated_tracker_df: pd.DataFrame, old_tracker_df: pd.DataFrame, col: str) -> pd.DataFrame:
@@ -234,6 +238,11 @@ def _rescind_records_from_tracker(updated_tracker_df: pd.DataFrame, rescinded_of
     return updated_tracker_df
 
 
+def _sort_tracker(tech_tracker_sheet: Worksheet) -> None:
+    sheet_dim = (tech_tracker_sheet.rows, tech_tracker_sheet.cols)
+    tech_tracker_sheet.sort_range((TECH_TRACKER_BASE_ROW, TECH_TRACKER_BASE_COL), sheet_dim, basecolumnindex=18, sortorder="DESCENDING")
+
+
 def _update_dataframe(stale_df: pd.DataFrame, current_data_df: pd.DataFrame) -> pd.DataFrame:
     """Generalized func to update one dataframe with data from another"""
     stale_df = stale_df[stale_df["job_candidate_id"] != ""]
@@ -270,21 +279,24 @@ def _update_tracker_data(tracker_backup_df: pd.DataFrame, jobvite_df: pd.DataFra
     return updated_tracker_df
 
 
-def refresh_onboarding_tracker(tech_tracker_spreadsheet: Spreadsheet, hr_spreadsheet: Spreadsheet, year: str) -> None:
-    dataset = os.getenv("GBQ_DATASET")
-    bq_conn = BigQueryClient()
+def _fetch_stage(tech_tracker_spreadsheet: Spreadsheet, tech_tracker_sheet: Worksheet, bq_conn: BigQueryClient,
+                 dataset: str, year: str) -> Dict[str, pd.DataFrame]:
     jobvite_df = _get_and_prep_jobvite_data(bq_conn, dataset, year)
-
-    tracker_name = f"{year} Tracker"
-    tech_tracker_sheet = tech_tracker_spreadsheet.worksheet_by_title(tracker_name)
-    tracker_backup_df = _get_and_prep_tracker_df(tech_tracker_sheet)
+    tracker_backup_df, tracker_checksum = _get_and_prep_tracker_df(tech_tracker_sheet)
 
     # Tech Tracker has ability to clear onboarders who have completed onboarding to an archive sheet
     # The below filters those onboarders out of the Jobvite dataset
-    cleared_ids_df = _get_cleared_tech_ids(tech_tracker_spreadsheet, year)
-    jobvite_df = _filter_out_cleared_on_boarders(cleared_ids_df, jobvite_df)
+    cleared_ids = _get_cleared_tech_ids(tech_tracker_spreadsheet, year)
+    jobvite_df = _filter_out_cleared_on_boarders(cleared_ids, jobvite_df)
     logging.info(f"Found {len(jobvite_df)} records to add or update")
+    return {
+        "jobvite": jobvite_df,
+        "tracker_backup": tracker_backup_df,
+        "tracker_checksum": pd.DataFrame({"checksum": [tracker_checksum]}),
+    }
+
 
+def _reconcile_stage(tracker_backup_df: pd.DataFrame, jobvite_df: pd.DataFrame, tracker_name: str) -> pd.DataFrame:
     updated_tracker_df = pd.DataFrame()
 
     if not tracker_backup_df.empty:
@@ -299,20 +311,66 @@ def refresh_onboarding_tracker(tech_tracker_spreadsheet: Spreadsheet, hr_spreads
         logging.info(f"Adding {len(new_records)} new records to sheet {tracker_name}")
     else:
         logging.info(f"No new records to add to tracker sheet {tracker_name}")
+    return updated_tracker_df
+
+
+def _enrich_stage(updated_tracker_df: pd.DataFrame, hr_spreadsheet: Spreadsheet, bq_conn: BigQueryClient,
+                  dataset: str, year: str) -> pd.DataFrame:
+    rescinded_offer_ids = _get_rescinded_offers(bq_conn, dataset)
+    if rescinded_offer_ids is not None:
+        _rescind_records_from_tracker(updated_tracker_df, rescinded_offer_ids)
+
+    updated_tracker_df = _pull_cleared_field_from_hr_onboarding_tracker(updated_tracker_df, hr_spreadsheet, year)
+
+    # Converting Start Date field to string for insertion
+    updated_tracker_df["Start Date"] = updated_tracker_df["Start Date"].dt.strftime("%m/%d/%Y")
+    return updated_tracker_df
+
+
+def refresh_onboarding_tracker(tech_tracker_spreadsheet: Spreadsheet, hr_spreadsheet: Spreadsheet, year: str,
+                               run_dir: str, write_mode: str = DEFAULT_WRITE_MODE) -> None:
+    """Runs the fetch, reconcile, enrich and write stages, checkpointing each stage's output to run_dir.
+    Stages already checkpointed in run_dir are loaded instead of rerun."""
+    dataset = os.getenv("GBQ_DATASET")
+    bq_conn = BigQueryClient()
+
+    tracker_name = f"{year} Tracker"
+    tech_tracker_sheet = tech_tracker_spreadsheet.worksheet_by_title(tracker_name)
+
+    if is_stage_complete(run_dir, "fetch"):
+        fetched = load_stage(run_dir, "fetch")
+    else:
+        fetched = _fetch_stage(tech_tracker_spreadsheet, tech_tracker_sheet, bq_conn, dataset, year)
+        save_stage(run_dir, "fetch", fetched)
+    # Checksum of the tracker as the fetch stage read it, so a resumed run still compares against the original read
+    tracker_checksum = fetched["tracker_checksum"]["checksum"].iloc[0]
+
+    if is_stage_complete(run_dir, "reconcile"):
+        updated_tracker_df = load_stage(run_dir, "reconcile")["updated_tracker"]
+    else:
+        updated_tracker_df = _reconcile_stage(fetched["tracker_backup"], fetched["jobvite"], tracker_name)
+        save_stage(run_dir, "reconcile", {"updated_tracker": updated_tracker_df})
 
     if not updated_tracker_df.empty:
-        rescinded_offer_ids = _get_rescinded_offers(bq_conn, dataset)
-        if rescinded_offer_ids is not None:
-            _rescind_records_from_tracker(updated_tracker_df, rescinded_offer_ids)
-        
-        updated_tracker_df = _pull_cleared_field_from_hr_onboarding_tracker(updated_tracker_df, hr_spreadsheet, year)
-        
-        # Converting Start Date field to string for insertion
-        updated_tracker_df["Start Date"] = updated_tracker_df["Start Date"].dt.strftime("%m/%d/%Y")
-        
-        _insert_updated_data_to_google_sheets(updated_tracker_df, tech_tracker_sheet)
+        if is_stage_complete(run_dir, "enrich"):
+            updated_tracker_df = load_stage(run_dir, "enrich")["updated_tracker"]
+        else:
+            updated_tracker_df = _enrich_stage(updated_tracker_df, hr_spreadsheet, bq_conn, dataset, year)
+            save_stage(run_dir, "enrich", {"updated_tracker": updated_tracker_df})
+
+        if not is_stage_complete(run_dir, "write"):
+            if not is_range_unchanged(tech_tracker_sheet, *_get_tracker_range(tech_tracker_sheet), tracker_checksum):
+                # The checkpointed data is stale now, so the run is closed out rather than left to be resumed
+                mark_run_complete(run_dir)
+                return
+            _insert_updated_data_to_google_sheets(updated_tracker_df, tech_tracker_sheet, write_mode)
+            # Checkpointed before sorting so a resume after a failed sort doesn't mistake the job's own
+            # write for someone else's edit; it only redoes the sort and timestamp
+            save_stage(run_dir, "write", {})
+        _sort_tracker(tech_tracker_sheet)
         logger.info(f"Finished refreshing tracker sheet {tracker_name}")
     else:
         logger.info(f"No updates found. Nothing to refresh in sheet {tracker_name}")
 
     _create_tracker_updated_timestamp(tech_tracker_sheet)
+    mark_run_complete(run_dir)
@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+import tempfile
+from typing import Dict
+
+from google.cloud import bigquery
+import pandas as pd
+
+from utils.parquet_utils import normalize_for_parquet
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = "stg_tech_tracker__sla_sheets"
+RESULT_TABLE = "rpt_tech_tracker__sla_data_source"
+ROLLUP_TABLE = "rpt_tech_tracker__sla_rollup"
+
+# Preserves load order so the sheet rows come back in the same order as the pandas path
+ROW_ID_COL = "_row_id"
+
+SLA_TIMEZONE = "America/Los_Angeles"
+
+# Computed columns, in the order refresh_sla_source adds them in pandas
+SLA_FIELD_COLUMNS = [
+    "Hire_Month",
+    "StartDateChange_Boolean",
+    "LocationChange_Boolean",
+    "TechCleared_MetSLA_Boolean",
+    "TechCleared_Timeliness",
+    "Include_SLA_Denominator",
+]
+
+# Mirrors _compare_dates_new_col, _eval_sla_met, _eval_tech_timeliness and _eval_sla_denominator_field
+SLA_RESULT_QUERY = """
+CREATE OR REPLACE TABLE `{result_ref}` AS
+WITH staged AS (
+    SELECT
+        *,
+        DATE(StartDate) AS _start_date,
+        DATE(DateCleared) AS _date_cleared,
+        DATE_ADD(CURRENT_DATE('{timezone}'), INTERVAL 1 DAY) AS _sla_deadline
+    FROM `{staging_ref}`
+)
+SELECT
+    * EXCEPT (_start_date, _date_cleared, _sla_deadline, DateCleared),
+    IFNULL(FORMAT_DATE('%Y-%m-%d', _date_cleared), '') AS DateCleared,
+    FORMAT_DATE('%B', _start_date) AS Hire_Month,
+    IF(DateAdded < StartDate_LastUpdated, 1, 0) AS StartDateChange_Boolean,
+    IF(DateAdded < PayLocation_LastUpdated, 1, 0) AS LocationChange_Boolean,
+    IFNULL(CAST(
+        IF(_date_cleared IS NULL,
+           IF(_sla_deadline > _start_date, 0, NULL),
+           IF(DATE_ADD(_date_cleared, INTERVAL 1 DAY) <= _start_date, 1, 0))
+        AS STRING), '') AS TechCleared_MetSLA_Boolean,
+    IFNULL(CAST(DATE_DIFF(_date_cleared, _start_date, DAY) AS STRING), '') AS TechCleared_Timeliness,
+    IF(_date_cleared IS NULL, IF(_sla_deadline > _start_date, 1, 0), 1) AS Include_SLA_Denominator
+FROM staged;
+
+CREATE OR REPLACE TABLE `{rollup_ref}` AS
+SELECT
+    SchoolYear,
+    Hire_Month,
+    SUM(SAFE_CAST(TechCleared_MetSLA_Boolean AS INT64)) AS sla_met,
+    SUM(Include_SLA_Denominator) AS sla_denominator,
+    SAFE_DIVIDE(SUM(SAFE_CAST(TechCleared_MetSLA_Boolean AS INT64)), SUM(Include_SLA_Denominator)) AS sla_rate
+FROM `{result_ref}`
+GROUP BY SchoolYear, Hire_Month;
+"""
+
+
+def _bq_safe_column_names(columns: pd.Index) -> Dict[str, str]:
+    """Sheet headers can contain characters BigQuery doesn't allow in column names (ex. 'GLS Tracking #').
+    Raises if sanitizing leaves a name BigQuery rejects or maps two headers to the same name."""
+    column_map = {col: re.sub(r"[^0-9A-Za-z_]", "_", str(col)) for col in columns}
+
+    invalid = [col for col, safe in column_map.items() if not re.match(r"^[A-Za-z_]", safe)]
+    if invalid:
+        raise ValueError(f"Sheet headers {invalid} can't be used as BigQuery column names; "
+                         f"they are empty or start with a digit")
+
+    safe_names = list(column_map.values()) + [ROW_ID_COL]
+    duplicates = sorted({safe for safe in safe_names if safe_names.count(safe) > 1})
+    if duplicates or len(column_map) != len(columns):
+        colliding = [col for col in columns if column_map.get(col) in duplicates]
+        raise ValueError(f"Sheet headers {colliding or list(columns)} collide as BigQuery column names "
+                         f"{duplicates or 'after sanitizing'}; rename them in the tracker sheets")
+    return column_map
+
+
+def _table_ref(client: bigquery.Client, dataset: str, table_name: str) -> str:
+    return f"{client.project}.{dataset}.{table_name}"
+
+
+def _match_pandas_datetimes(result_df: pd.DataFrame, agg_df: pd.DataFrame) -> None:
+    """The parquet load stores pandas' naive datetime columns as TIMESTAMP, which come back UTC-aware
+    and would be written to the sheet as '2024-08-10 00:00:00+00:00'. Drops the timezone so they are
+    written as the same dates as the pandas path."""
+    for col in agg_df.select_dtypes(include="datetime").columns:
+        if isinstance(result_df[col].dtype, pd.DatetimeTZDtype):
+            result_df[col] = result_df[col].dt.tz_convert(None)
+
+
+def _load_staging_table(client: bigquery.Client, dataset: str, agg_df: pd.DataFrame) -> None:
+    """Writes the combined sheets to a local parquet file and loads it with a single load job"""
+    staging_ref = _table_ref(client, dataset, STAGING_TABLE)
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+    )
+    with tempfile.NamedTemporaryFile(suffix=".parquet") as parquet_file:
+        agg_df.to_parquet(parquet_file.name, index=False)
+        with open(parquet_file.name, "rb") as source_file:
+            job = client.load_table_from_file(source_file, staging_ref, job_config=job_config)
+        job.result()
+    logger.info(f"Loaded {len(agg_df)} rows into {staging_ref}")
+
+
+def compute_sla_fields_in_bigquery(agg_df: pd.DataFrame) -> pd.DataFrame:
+    """Computes the SLA fields in BigQuery from the normalized Tracker and Cleared sheets. The result and
+    a SchoolYear/Hire_Month rollup are kept as tables in GBQ_DATASET so dbt can build on them."""
+    dataset = os.getenv("GBQ_DATASET")
+    client = bigquery.Client(project=os.getenv("GBQ_PROJECT"))
+
+    column_map = _bq_safe_column_names(agg_df.columns)
+    staged_df = normalize_for_parquet(agg_df.rename(columns=column_map))
+    staged_df[ROW_ID_COL] = staged_df.index
+    _load_staging_table(client, dataset, staged_df)
+
+    result_ref = _table_ref(client, dataset, RESULT_TABLE)
+    logger.info(f"Computing SLA fields into {result_ref}")
+    client.query(SLA_RESULT_QUERY.format(
+        result_ref=result_ref,
+        rollup_ref=_table_ref(client, dataset, ROLLUP_TABLE),
+        staging_ref=_table_ref(client, dataset, STAGING_TABLE),
+        timezone=SLA_TIMEZONE,
+    )).result()
+
+    result_df = client.query(f"SELECT * FROM `{result_ref}` ORDER BY {ROW_ID_COL}").to_dataframe()
+    result_df = result_df.rename(columns={safe: col for col, safe in column_map.items()})
+    _match_pandas_datetimes(result_df, agg_df)
+    return result_df[list(agg_df.columns) + SLA_FIELD_COLUMNS]
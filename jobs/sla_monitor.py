@@ -6,8 +6,24 @@ import numpy as np
 import pandas as pd
 from pygsheets import Spreadsheet
 
+from jobs.sla_bigquery import compute_sla_fields_in_bigquery
+from utils.sheet_writer import write_dataframe
+from utils.snapshot_store import append_snapshot, apply_retention, compact_partitions
+from utils.write_modes import DEFAULT_WRITE_MODE
+
 logger = logging.getLogger(__name__)
 
+SLA_SNAPSHOT_STORE = "sla_data_source"
+
+# Number formats applied to SLA_data_source date columns when writing in paste mode
+SLA_COLUMN_FORMATS = {
+    "DateAdded": {"type": "DATE", "pattern": "yyyy-mm-dd"},
+    "StartDate": {"type": "DATE", "pattern": "yyyy-mm-dd"},
+    "StartDate_LastUpdated": {"type": "DATE", "pattern": "yyyy-mm-dd"},
+    "PayLocation_LastUpdated": {"type": "DATE", "pattern": "yyyy-mm-dd"},
+    "Main_LastUpdated": {"type": "DATE", "pattern": "yyyy-mm-dd"},
+}
+
 COLUMN_RENAME_MAP = {
     "New, Returners, Rehire or Transfer": "NewHire_Type",
     "Cleared?": "HR_Cleared",
@@ -112,8 +128,7 @@ def _identify_tracker_cleared_sheets(spreadsheet: Spreadsheet) -> Tuple[List[pd.
     return cleared, tracker
 
 
-def refresh_sla_source(spreadsheet: Spreadsheet) -> None:
-    sla_sheet = spreadsheet.worksheet_by_title("SLA_data_source")
+def _combine_tracker_cleared_sheets(spreadsheet: Spreadsheet) -> pd.DataFrame:
     cleared_dfs, tracker_dfs = _identify_tracker_cleared_sheets(spreadsheet)
 
     tracker_df = pd.concat(tracker_dfs)
@@ -138,8 +153,12 @@ def refresh_sla_source(spreadsheet: Spreadsheet) -> None:
     agg_df['Staff_Name'] = agg_df["First Name"].astype(str) + ' ' + agg_df["Last Name"].astype(str)
     agg_df = agg_df.drop(["First Name", "Last Name"], axis="columns")
 
-    # HIRE MONTH
     _datefields_to_dt_obj(agg_df)
+    return agg_df
+
+
+def _compute_sla_fields(agg_df: pd.DataFrame) -> pd.DataFrame:
+    # HIRE MONTH
     agg_df["Hire_Month"] = agg_df['StartDate'].dt.strftime('%B')
 
     # StartDateChange_Boolean
@@ -165,8 +184,27 @@ def refresh_sla_source(spreadsheet: Spreadsheet) -> None:
     # Converting NaT values in DateCleared field to blank strings
     agg_df["DateCleared"] = agg_df["DateCleared"].dt.strftime('%Y-%m-%d')
     agg_df["DateCleared"] = agg_df["DateCleared"].replace(pd.NaT, '')
+    return agg_df
+
+
+def refresh_sla_source(spreadsheet: Spreadsheet, in_bigquery: bool = False,
+                       write_mode: str = DEFAULT_WRITE_MODE) -> None:
+    sla_sheet = spreadsheet.worksheet_by_title("SLA_data_source")
+    agg_df = _combine_tracker_cleared_sheets(spreadsheet)
+
+    if in_bigquery:
+        logger.info("Computing SLA fields in BigQuery")
+        agg_df = compute_sla_fields_in_bigquery(agg_df)
+    else:
+        agg_df = _compute_sla_fields(agg_df)
 
     # push to Google Sheets
     logger.info("Inserting into SLA_data_source")
     sla_sheet.clear()
-    sla_sheet.set_dataframe(agg_df, "A1")
+    write_dataframe(sla_sheet, agg_df, "A1", write_mode=write_mode, column_formats=SLA_COLUMN_FORMATS)
+
+    # keep a dated history of the SLA data source for trend reporting
+    logger.info("Saving SLA snapshot")
+    append_snapshot(SLA_SNAPSHOT_STORE, agg_df)
+    compact_partitions(SLA_SNAPSHOT_STORE)
+    apply_retention(SLA_SNAPSHOT_STORE)
@@ -10,7 +10,9 @@ from jobs.sla_monitor import refresh_sla_source
 from jobs.offboarding_tracker_refresh import refresh_offboarding_tracker
 from jobs.onboarding_tracker_refresh import refresh_onboarding_tracker
 from utils.arg_parser import create_parser
+from utils.checkpoint import get_run_dir, is_stage_complete
 from utils.logger_config import get_logger
+from utils.run_lock import run_coalesced
 
 TECH_TRACKER_SHEET = os.getenv("TECH_TRACKER_SHEETS_ID")
 HR_TRACKER_SHEET = os.getenv("HR_TRACKER_SHEETS_ID")
@@ -35,23 +37,41 @@ def _refresh_dbt() -> None:
     sleep(30)
 
 
-def main(notifications):
-    tech_spreadsheet = create_sheet_connection(TECH_TRACKER_SHEET)
+def _refresh(tech_spreadsheet: Spreadsheet) -> None:
+    run_dir = None
+    if not (ARGS.sla_monitor_refresh or ARGS.offboarding_refresh):
+        run_dir = get_run_dir(f"onboarding_{ARGS.school_year[0]}", ARGS.resume)
 
-    if ARGS.dbt_refresh:
+    # A resumed run has already pulled its data, so refreshing dbt again is wasted work
+    if ARGS.dbt_refresh and not (run_dir and is_stage_complete(run_dir, "fetch")):
         _refresh_dbt()
 
+    if ARGS.sla_monitor_refresh:
+        refresh_sla_source(tech_spreadsheet, ARGS.sla_in_bigquery, ARGS.write_mode)
+    elif ARGS.offboarding_refresh:
+        refresh_offboarding_tracker(tech_spreadsheet, ARGS.write_mode)
+    else:
+        hr_mot_spreadsheet = create_sheet_connection(HR_TRACKER_SHEET)
+        refresh_onboarding_tracker(tech_spreadsheet, hr_mot_spreadsheet, ARGS.school_year[0], run_dir,
+                                   ARGS.write_mode)
+
+
+def main(notifications):
+    tech_spreadsheet = create_sheet_connection(TECH_TRACKER_SHEET)
+
+    # Lock is keyed by job and target sheet so overlapping runs of the same refresh are coalesced
     if ARGS.sla_monitor_refresh:
         notifications.extend_job_name("- SLA Monitor Refresh")
-        refresh_sla_source(tech_spreadsheet)
+        lock_key = f"sla_monitor__{TECH_TRACKER_SHEET}__SLA_data_source"
     elif ARGS.offboarding_refresh:
         notifications.extend_job_name("- Offboarding Refresh")
-        refresh_offboarding_tracker(tech_spreadsheet)
+        lock_key = f"offboarding__{TECH_TRACKER_SHEET}__Offboarding Tracker"
     else:
         school_year = ARGS.school_year[0]
         notifications.extend_job_name(f"- {ARGS.school_year[0]}")
-        hr_mot_spreadsheet = create_sheet_connection(HR_TRACKER_SHEET)
-        refresh_onboarding_tracker(tech_spreadsheet, hr_mot_spreadsheet, school_year)
+        lock_key = f"onboarding__{TECH_TRACKER_SHEET}__{school_year} Tracker"
+
+    run_coalesced(lock_key, lambda: _refresh(tech_spreadsheet), ARGS.queue_if_running)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 import argparse
 
+from utils.write_modes import DEFAULT_WRITE_MODE, WRITE_MODES
+
 
 def create_parser():
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
@@ -15,6 +17,12 @@ def create_parser():
         help="Refreshes Tech's SLA monitor data source",
         action="store_true"
     )
+    parser.add_argument(
+        "--sla-in-bigquery",
+        dest="sla_in_bigquery",
+        help="With --sla-refresh, loads the tracker sheets to BigQuery and computes SLA fields there",
+        action="store_true"
+    )
     parser.add_argument(
         "--dbt-refresh",
         dest="dbt_refresh",
@@ -27,5 +35,24 @@ def create_parser():
         help="Refreshes offboarding tracker",
         action="store_true"
     )
+    parser.add_argument(
+        "--resume",
+        dest="resume",
+        help="Resumes the most recent incomplete onboarding run at its first incomplete stage",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--queue-if-running",
+        dest="queue_if_running",
+        help="If the same refresh is already running, queues one follow-up run instead of exiting",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--write-mode",
+        dest="write_mode",
+        help="How frames are written to sheets: 'values' (set_dataframe) or 'paste' (pasteData batch request)",
+        choices=WRITE_MODES,
+        default=DEFAULT_WRITE_MODE
+    )
 
     return parser
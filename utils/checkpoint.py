@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import shutil
+from typing import Dict, List, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RUN_ROOT = os.getenv("RUN_DIR", default="runs")
+
+# Checkpoints older than this are too stale to write over the tracker, so --resume starts a new run instead
+CHECKPOINT_MAX_AGE_HOURS = int(os.getenv("CHECKPOINT_MAX_AGE_HOURS", default=24))
+RUN_RETENTION_DAYS = int(os.getenv("RUN_RETENTION_DAYS", default=14))
+
+RUN_ID_FORMAT = "%Y%m%d_%H%M%S"
+
+# Pipeline stages in the order they are executed
+STAGES = ["fetch", "reconcile", "enrich", "write"]
+
+STAGE_SUCCESS_FILE = "_SUCCESS"
+RUN_COMPLETE_FILE = "_COMPLETE"
+
+
+def _job_root(job_name: str) -> str:
+    return os.path.join(RUN_ROOT, job_name)
+
+
+def _stage_dir(run_dir: str, stage: str) -> str:
+    if stage not in STAGES:
+        raise ValueError(f"Unknown pipeline stage '{stage}'; expected one of {STAGES}")
+    return os.path.join(run_dir, stage)
+
+
+def _run_started_at(run_dir: str) -> datetime:
+    return datetime.strptime(os.path.basename(run_dir), RUN_ID_FORMAT)
+
+
+def _list_run_dirs(job_name: str) -> List[str]:
+    """Run directories for a job, oldest first"""
+    job_root = _job_root(job_name)
+    if not os.path.isdir(job_root):
+        return []
+    return [os.path.join(job_root, run_id) for run_id in sorted(os.listdir(job_root))
+            if os.path.isdir(os.path.join(job_root, run_id))]
+
+
+def create_run_dir(job_name: str) -> str:
+    run_id = datetime.now().strftime(RUN_ID_FORMAT)
+    run_dir = os.path.join(_job_root(job_name), run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    logger.info(f"Created run {run_id} for {job_name} in {run_dir}")
+    return run_dir
+
+
+def find_incomplete_run(job_name: str) -> Union[str, None]:
+    """Returns the job's latest run if it never finished. An older failed run is never returned once a
+    newer run exists, since its checkpoints would write stale data over the newer run's results."""
+    run_dirs = _list_run_dirs(job_name)
+    if not run_dirs or os.path.exists(os.path.join(run_dirs[-1], RUN_COMPLETE_FILE)):
+        return None
+    return run_dirs[-1]
+
+
+def prune_runs(job_name: str, retention_days: int = RUN_RETENTION_DAYS) -> None:
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    for run_dir in _list_run_dirs(job_name):
+        if _run_started_at(run_dir) < cutoff:
+            shutil.rmtree(run_dir)
+            logger.info(f"Removed run {os.path.basename(run_dir)} past {retention_days} day retention")
+
+
+def get_run_dir(job_name: str, resume: bool) -> str:
+    prune_runs(job_name)
+    if resume:
+        run_dir = find_incomplete_run(job_name)
+        if run_dir is None:
+            logger.info(f"Latest run for {job_name} is not incomplete; starting a new run")
+        elif datetime.now() - _run_started_at(run_dir) > timedelta(hours=CHECKPOINT_MAX_AGE_HOURS):
+            logger.warning(f"Not resuming run {os.path.basename(run_dir)} for {job_name}; its checkpoints are "
+                           f"older than {CHECKPOINT_MAX_AGE_HOURS} hours. Starting a new run")
+        else:
+            logger.info(f"Resuming {job_name} from run {os.path.basename(run_dir)}")
+            return run_dir
+    return create_run_dir(job_name)
+
+
+def is_stage_complete(run_dir: str, stage: str) -> bool:
+    return os.path.exists(os.path.join(_stage_dir(run_dir, stage), STAGE_SUCCESS_FILE))
+
+
+def save_stage(run_dir: str, stage: str, frames: Dict[str, pd.DataFrame]) -> None:
+    """Persists a stage's output frames; the success marker is written last so a
+    stage interrupted mid-save is treated as incomplete"""
+    stage_dir = _stage_dir(run_dir, stage)
+    os.makedirs(stage_dir, exist_ok=True)
+    for name, df in frames.items():
+        df.to_pickle(os.path.join(stage_dir, f"{name}.pkl"))
+    open(os.path.join(stage_dir, STAGE_SUCCESS_FILE), "w").close()
+    logger.info(f"Checkpointed stage '{stage}' ({len(frames)} frames)")
+
+
+def load_stage(run_dir: str, stage: str) -> Dict[str, pd.DataFrame]:
+    stage_dir = _stage_dir(run_dir, stage)
+    frames = {}
+    for file_name in os.listdir(stage_dir):
+        if file_name.endswith(".pkl"):
+            frames[file_name[:-4]] = pd.read_pickle(os.path.join(stage_dir, file_name))
+    logger.info(f"Loaded stage '{stage}' from checkpoint; skipping")
+    return frames
+
+
+def mark_run_complete(run_dir: str) -> None:
+    """Marks the run complete and drops its checkpointed frames. The run directory itself is kept
+    so an older failed run is never mistaken for the latest one."""
+    open(os.path.join(run_dir, RUN_COMPLETE_FILE), "w").close()
+    for stage in STAGES:
+        shutil.rmtree(_stage_dir(run_dir, stage), ignore_errors=True)
+    logger.info(f"Run {os.path.basename(run_dir)} complete")
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import List, Set
+
+from pygsheets import Worksheet
+
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = os.getenv("CACHE_DIR", default="cache")
+
+# Number of trailing rows checksummed to detect edits to previously read rows
+TAIL_SIZE = 25
+
+# Edits above the checksummed tail (ex. blanking an ID to un-clear someone) are only caught by a full reread
+FULL_REREAD_HOURS = int(os.getenv("CLEARED_CACHE_FULL_REREAD_HOURS", default=24))
+
+
+def _cache_path(worksheet: Worksheet) -> str:
+    file_name = re.sub(r"[^0-9A-Za-z_.-]", "_", f"{worksheet.spreadsheet.id}__{worksheet.title}")
+    return os.path.join(CACHE_ROOT, f"{file_name}.json")
+
+
+def _tail_checksum(values: List[str]) -> str:
+    return hashlib.sha256("\n".join(values[-TAIL_SIZE:]).encode()).hexdigest()
+
+
+def _read_id_column(worksheet: Worksheet, start_row: int, col: int) -> List[str]:
+    """Returns the column from start_row down to the last non-empty row, with blank rows as empty strings"""
+    if start_row > worksheet.rows:
+        return []
+    values = worksheet.get_values((start_row, col), (worksheet.rows, col), include_tailing_empty=False)
+    return [str(row[0]) if row else "" for row in values]
+
+
+def _load_cache(cache_path: str) -> dict:
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as cache_file:
+        return json.load(cache_file)
+
+
+def _save_cache(cache_path: str, row_count: int, tail_checksum: str, ids: Set[str], full_read_at: str) -> None:
+    os.makedirs(CACHE_ROOT, exist_ok=True)
+    with open(cache_path, "w") as cache_file:
+        json.dump({
+            "row_count": row_count,
+            "tail_checksum": tail_checksum,
+            "ids": sorted(ids),
+            "full_read_at": full_read_at,
+        }, cache_file)
+
+
+def _is_full_reread_due(cache: dict) -> bool:
+    full_read_at = datetime.fromisoformat(cache.get("full_read_at", datetime.min.isoformat()))
+    return datetime.now() - full_read_at > timedelta(hours=FULL_REREAD_HOURS)
+
+
+def _save_full_read(cache_path: str, values: List[str]) -> Set[str]:
+    ids = {value for value in values if value}
+    _save_cache(cache_path, len(values), _tail_checksum(values), ids, datetime.now().isoformat())
+    return ids
+
+
+def update_cleared_ids_cache(worksheet: Worksheet, values: List[str]) -> None:
+    """Replaces the cache with the ID column a job just wrote to the sheet, so its own rewrite
+    doesn't force a full reread on the next run"""
+    _save_full_read(_cache_path(worksheet), [str(value) for value in values])
+    logger.info(f"Updated cleared ID cache for '{worksheet.title}' with {len(values)} written rows")
+
+
+def get_cleared_ids(worksheet: Worksheet, data_row: int, id_col: int) -> Set[str]:
+    """Returns the set of IDs in an append-only archive sheet's ID column. Only rows added since the last
+    run are fetched; the whole column is reread when the previously cached tail no longer matches or the
+    last full read is older than FULL_REREAD_HOURS."""
+    cache_path = _cache_path(worksheet)
+    cache = _load_cache(cache_path)
+
+    if cache and _is_full_reread_due(cache):
+        logger.info(f"Last full read of '{worksheet.title}' is over {FULL_REREAD_HOURS} hours old; rereading all IDs")
+    elif cache:
+        cached_count = cache["row_count"]
+        tail_start = max(cached_count - TAIL_SIZE, 0)
+        fetched = _read_id_column(worksheet, data_row + tail_start, id_col)
+        old_tail, new_values = fetched[:cached_count - tail_start], fetched[cached_count - tail_start:]
+        if len(old_tail) == cached_count - tail_start and _tail_checksum(old_tail) == cache["tail_checksum"]:
+            ids = set(cache["ids"]) | {value for value in new_values if value}
+            row_count = cached_count + len(new_values)
+            logger.info(f"Read {len(new_values)} new rows from '{worksheet.title}' since the last run")
+            _save_cache(cache_path, row_count, _tail_checksum(fetched), ids, cache["full_read_at"])
+            return ids
+        logger.info(f"'{worksheet.title}' was edited since the last run; rereading all IDs")
+
+    values = _read_id_column(worksheet, data_row, id_col)
+    ids = _save_full_read(cache_path, values)
+    logger.info(f"Read {len(values)} rows from '{worksheet.title}'")
+    return ids
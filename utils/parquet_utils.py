@@ -0,0 +1,11 @@
+import pandas as pd
+
+
+def normalize_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Object columns mix empty strings with ints and dates, which parquet can't store in a single
+    column type, so their values are written as strings; nulls stay null rather than becoming 'None'
+    or 'nan'. Datetime and numeric columns keep their types."""
+    df = df.copy()
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df.reset_index(drop=True)
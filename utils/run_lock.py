@@ -0,0 +1,131 @@
+from contextlib import contextmanager
+from datetime import datetime
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+from time import time_ns
+from typing import Callable, Iterator, List, Tuple
+
+import pandas as pd
+from pygsheets import Worksheet
+from pygsheets.utils import numericise_all
+
+logger = logging.getLogger(__name__)
+
+LOCK_ROOT = os.getenv("LOCK_DIR", default="locks")
+
+
+def _lock_path(lock_key: str, suffix: str) -> str:
+    file_name = re.sub(r"[^0-9A-Za-z_.-]", "_", lock_key)
+    return os.path.join(LOCK_ROOT, f"{file_name}.{suffix}")
+
+
+@contextmanager
+def run_lock(lock_key: str) -> Iterator[bool]:
+    """Non-blocking exclusive lock; yields False if another process already holds it"""
+    os.makedirs(LOCK_ROOT, exist_ok=True)
+    with open(_lock_path(lock_key, "lock"), "a+") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.seek(0)
+            logger.warning(f"Another run of {lock_key} is already active ({lock_file.read().strip()})")
+            yield False
+            return
+        try:
+            lock_file.truncate(0)
+            lock_file.write(f"pid {os.getpid()} since {datetime.now().isoformat(timespec='seconds')}")
+            lock_file.flush()
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _request_follow_up_run(lock_key: str) -> None:
+    """Each queued request is its own file, so a request is never lost to a holder reading or clearing
+    the queue at the same time, and the holder can log how many duplicate runs were coalesced"""
+    pending_dir = _lock_path(lock_key, "queue")
+    os.makedirs(pending_dir, exist_ok=True)
+    open(os.path.join(pending_dir, f"{os.getpid()}_{time_ns()}"), "w").close()
+
+
+def _list_follow_up_requests(lock_key: str) -> List[str]:
+    pending_dir = _lock_path(lock_key, "queue")
+    if not os.path.isdir(pending_dir):
+        return []
+    return [os.path.join(pending_dir, file_name) for file_name in os.listdir(pending_dir)]
+
+
+def _pop_follow_up_requests(lock_key: str) -> int:
+    """Removes only the requests seen when listing; one queued after that stays for the next check"""
+    request_paths = _list_follow_up_requests(lock_key)
+    for request_path in request_paths:
+        os.remove(request_path)
+    return len(request_paths)
+
+
+def _run_follow_ups(lock_key: str, run_job: Callable[[], None]) -> None:
+    request_count = _pop_follow_up_requests(lock_key)
+    while request_count:
+        if request_count > 1:
+            logger.warning(f"Coalesced {request_count} queued runs of {lock_key} into one follow-up run")
+        logger.info(f"Running queued follow-up run of {lock_key}")
+        run_job()
+        request_count = _pop_follow_up_requests(lock_key)
+
+
+def run_coalesced(lock_key: str, run_job: Callable[[], None], queue_follow_up: bool) -> None:
+    """Runs run_job unless another run holding lock_key is active. If one is, either exit right away
+    or queue a single follow-up run for the active process to pick up when it finishes."""
+    with run_lock(lock_key) as acquired:
+        if not acquired:
+            if queue_follow_up:
+                _request_follow_up_run(lock_key)
+                logger.warning(f"Queued a follow-up run of {lock_key} for the active run to pick up")
+            else:
+                logger.warning(f"Skipped duplicate run of {lock_key}")
+            return
+
+        # A request left behind by a holder that crashed is satisfied by this fresh run
+        _pop_follow_up_requests(lock_key)
+        run_job()
+        _run_follow_ups(lock_key, run_job)
+
+    # A request queued after the last check but before the lock was released has no one left to run it,
+    # so take the lock again for it. If another run holds the lock by then, that run picks it up.
+    while _list_follow_up_requests(lock_key):
+        with run_lock(lock_key) as acquired:
+            if not acquired:
+                return
+            _run_follow_ups(lock_key, run_job)
+
+
+def _values_checksum(values: List[List[str]]) -> str:
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def get_range_checksum(worksheet: Worksheet, start: Tuple[int, int], end: Tuple[int, int]) -> str:
+    """Hash of the values in a worksheet range. Compared before writing to catch edits made after the
+    job read the range; unlike the spreadsheet's modified time it ignores writes to other tabs."""
+    return _values_checksum(worksheet.get_values(start, end, include_tailing_empty=False))
+
+
+def get_as_df_with_checksum(worksheet: Worksheet, start: Tuple[int, int],
+                            end: Tuple[int, int]) -> Tuple[pd.DataFrame, str]:
+    """Same frame as worksheet.get_as_df(has_header=True, include_tailing_empty=False) plus the range's
+    checksum, taken from the same read so the range isn't fetched a second time"""
+    values = worksheet.get_values(start, end, include_tailing_empty=False)
+    max_row = max(len(row) for row in values)
+    frame_values = [numericise_all(row + [""] * (max_row - len(row))) for row in values]
+    return pd.DataFrame(frame_values[1:], columns=frame_values[0]), _values_checksum(values)
+
+
+def is_range_unchanged(worksheet: Worksheet, start: Tuple[int, int], end: Tuple[int, int], checksum: str) -> bool:
+    if get_range_checksum(worksheet, start, end) == checksum:
+        return True
+    logger.warning(f"'{worksheet.title}' was edited after the job read it; skipping the write so those edits "
+                   f"aren't overwritten. The next run will pick them up.")
+    return False
@@ -0,0 +1,120 @@
+import logging
+from typing import Dict, List, Tuple, Union
+
+import pandas as pd
+from pygsheets import Worksheet
+from pygsheets.address import Address
+
+from utils.write_modes import DEFAULT_WRITE_MODE, WRITE_MODES
+
+logger = logging.getLogger(__name__)
+
+PASTE_DELIMITER = "\t"
+
+# pasteData reads a double quote at the start of a cell as a text qualifier, like CSV
+PASTE_QUOTE = '"'
+
+# Matches set_dataframe's default so both write modes produce the same cells
+NAN_VALUE = "NaN"
+
+# Characters that make a cell need cleaning before it can be pasted
+PASTE_SPECIAL_CHARACTERS = ("\n", "\r", PASTE_QUOTE)
+PASTE_CLEANUP = str.maketrans({PASTE_DELIMITER: " ", "\n": " ", "\r": " "})
+
+
+def _clean_cell(cell: str) -> str:
+    cell = cell.translate(PASTE_CLEANUP)
+    if PASTE_QUOTE in cell:
+        cell = PASTE_QUOTE + cell.replace(PASTE_QUOTE, PASTE_QUOTE * 2) + PASTE_QUOTE
+    return cell
+
+
+def _join_row(row: List[str]) -> str:
+    line = PASTE_DELIMITER.join(row)
+    # Cells rarely hold tabs, line breaks or quotes, so check the joined row before paying for a
+    # per-cell cleanup
+    if line.count(PASTE_DELIMITER) != len(row) - 1 or any(char in line for char in PASTE_SPECIAL_CHARACTERS):
+        line = PASTE_DELIMITER.join(_clean_cell(cell) for cell in row)
+    return line
+
+
+def serialize_dataframe(df: pd.DataFrame, copy_head: bool = True) -> Tuple[str, int]:
+    """Converts the frame to delimited text in one pass; returns the text and its number of rows.
+    Delimiters and line breaks inside cells are replaced with spaces since pasteData splits on them, and
+    cells holding double quotes are quoted CSV style so their quotes are pasted as text."""
+    df = df.copy()
+    for col in df.select_dtypes("Int64"):
+        df[col] = df[col].astype("unicode").replace("<NA>", NAN_VALUE)
+    rows = df.fillna(NAN_VALUE).astype("unicode").values.tolist()
+    if copy_head:
+        rows.insert(0, [str(col) for col in df.columns])
+    return "\n".join(_join_row(row) for row in rows), len(rows)
+
+
+def build_paste_requests(sheet_id: int, df: pd.DataFrame, start: Tuple[int, int], copy_head: bool = True,
+                         column_formats: Union[Dict[str, dict], None] = None) -> List[dict]:
+    """Builds a pasteData request for df at start (1-indexed row, col), followed by a repeatCell request
+    per column in column_formats, ex. {"DateAdded": {"type": "DATE", "pattern": "yyyy-mm-dd"}}"""
+    start_row, start_col = start[0] - 1, start[1] - 1
+    text, row_count = serialize_dataframe(df, copy_head)
+    requests = [{
+        "pasteData": {
+            "coordinate": {"sheetId": sheet_id, "rowIndex": start_row, "columnIndex": start_col},
+            "data": text,
+            # Values only, like set_dataframe, so formatting applied by hand to the target cells is kept
+            "type": "PASTE_VALUES",
+            "delimiter": PASTE_DELIMITER,
+        }
+    }]
+
+    data_start_row = start_row + 1 if copy_head else start_row
+    for col_name, number_format in (column_formats or {}).items():
+        col_index = start_col + df.columns.get_loc(col_name)
+        requests.append({
+            "repeatCell": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "startRowIndex": data_start_row,
+                    "endRowIndex": start_row + row_count,
+                    "startColumnIndex": col_index,
+                    "endColumnIndex": col_index + 1,
+                },
+                "cell": {"userEnteredFormat": {"numberFormat": number_format}},
+                "fields": "userEnteredFormat.numberFormat",
+            }
+        })
+    return requests
+
+
+def paste_dataframe(worksheet: Worksheet, df: pd.DataFrame, start, copy_head: bool = True,
+                    column_formats: Union[Dict[str, dict], None] = None) -> None:
+    if df.empty and not copy_head:
+        logger.debug(f"Nothing to paste into '{worksheet.title}'")
+        return
+    start = Address(start)
+    start = (start[0], start[1])
+    requests = build_paste_requests(worksheet.id, df, start, copy_head, column_formats)
+
+    # Grow the grid in the same batch if the frame runs past the last row or column
+    rows_needed = start[0] - 1 + len(df) + (1 if copy_head else 0)
+    cols_needed = start[1] - 1 + len(df.columns)
+    grow_by = {"ROWS": rows_needed - worksheet.rows, "COLUMNS": cols_needed - worksheet.cols}
+    for dimension, length in grow_by.items():
+        if length > 0:
+            requests.insert(0, {"appendDimension": {"sheetId": worksheet.id, "dimension": dimension, "length": length}})
+
+    worksheet.client.sheet.batch_update(worksheet.spreadsheet.id, requests)
+    if max(grow_by.values()) > 0:
+        worksheet.refresh()
+
+
+def write_dataframe(worksheet: Worksheet, df: pd.DataFrame, start, copy_head: bool = True,
+                    write_mode: str = DEFAULT_WRITE_MODE, column_formats: Union[Dict[str, dict], None] = None) -> None:
+    """Writes df to worksheet at start using the selected write mode. column_formats only apply in paste mode."""
+    logger.debug(f"Writing {len(df)} rows to '{worksheet.title}' in {write_mode} mode")
+    if write_mode == "paste":
+        paste_dataframe(worksheet, df, start, copy_head, column_formats)
+    elif write_mode == "values":
+        worksheet.set_dataframe(df, start, copy_head=copy_head)
+    else:
+        raise ValueError(f"Unknown write mode '{write_mode}'; expected one of {WRITE_MODES}")
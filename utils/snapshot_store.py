@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta
+import logging
+import os
+import shutil
+from typing import List, Union
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from utils.parquet_utils import normalize_for_parquet
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ROOT = os.getenv("SNAPSHOT_DIR", default="snapshots")
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", default=730))
+
+# Hive-style partition directory prefix, ex. snapshot_date=2024-08-01
+PARTITION_PREFIX = "snapshot_date="
+PARTITION_DATE_FORMAT = "%Y-%m-%d"
+
+# Snapshots are filed and ordered by the local time of the run, not the container's UTC clock
+SNAPSHOT_TIMEZONE = "America/Los_Angeles"
+
+
+def _now() -> datetime:
+    return datetime.now(ZoneInfo(SNAPSHOT_TIMEZONE))
+
+
+def _store_dir(store_name: str) -> str:
+    return os.path.join(SNAPSHOT_ROOT, store_name)
+
+
+def _partition_dir(store_name: str, snapshot_date: date) -> str:
+    return os.path.join(_store_dir(store_name), f"{PARTITION_PREFIX}{snapshot_date.strftime(PARTITION_DATE_FORMAT)}")
+
+
+def _list_partition_dates(store_name: str) -> List[date]:
+    store_dir = _store_dir(store_name)
+    if not os.path.isdir(store_dir):
+        return []
+    partition_dates = []
+    for dir_name in os.listdir(store_dir):
+        if dir_name.startswith(PARTITION_PREFIX):
+            partition_dates.append(datetime.strptime(dir_name[len(PARTITION_PREFIX):], PARTITION_DATE_FORMAT).date())
+    return sorted(partition_dates)
+
+
+def _list_part_files(partition_dir: str) -> List[str]:
+    return sorted(
+        os.path.join(partition_dir, file_name)
+        for file_name in os.listdir(partition_dir)
+        if file_name.endswith(".parquet")
+    )
+
+
+def append_snapshot(store_name: str, df: pd.DataFrame, snapshot_date: Union[date, None] = None) -> str:
+    """Writes df as a new part file in the partition for snapshot_date (today in SNAPSHOT_TIMEZONE by default)"""
+    snapshot_date = snapshot_date or _now().date()
+    partition_dir = _partition_dir(store_name, snapshot_date)
+    os.makedirs(partition_dir, exist_ok=True)
+    part_file = os.path.join(partition_dir, f"part-{_now().strftime('%H%M%S%f')}.parquet")
+    normalize_for_parquet(df).to_parquet(part_file, index=False)
+    logger.info(f"Appended {len(df)} rows to {store_name} snapshot {snapshot_date}")
+    return part_file
+
+
+def read_snapshots(store_name: str, start: Union[date, None] = None, end: Union[date, None] = None,
+                   columns: Union[List[str], None] = None) -> pd.DataFrame:
+    """Reads snapshots between start and end (inclusive), only opening partitions in range
+    and only the requested columns. Adds a snapshot_date column."""
+    frames = []
+    for partition_date in _list_partition_dates(store_name):
+        if (start and partition_date < start) or (end and partition_date > end):
+            continue
+        for part_file in _list_part_files(_partition_dir(store_name, partition_date)):
+            df = pd.read_parquet(part_file, columns=columns)
+            df["snapshot_date"] = partition_date
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=(columns or []) + ["snapshot_date"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_snapshot_as_of(store_name: str, as_of: date, columns: Union[List[str], None] = None) -> pd.DataFrame:
+    """Returns the most recent snapshot taken on or before as_of"""
+    partition_dates = [d for d in _list_partition_dates(store_name) if d <= as_of]
+    if not partition_dates:
+        return pd.DataFrame(columns=(columns or []) + ["snapshot_date"])
+    latest = partition_dates[-1]
+    return read_snapshots(store_name, start=latest, end=latest, columns=columns)
+
+
+def sla_rate_trend(store_name: str, start: Union[date, None] = None, end: Union[date, None] = None,
+                   freq: str = "W") -> pd.DataFrame:
+    """SLA met rate per period, using the last snapshot taken in each period"""
+    df = read_snapshots(store_name, start, end, columns=["TechCleared_MetSLA_Boolean", "Include_SLA_Denominator"])
+    if df.empty:
+        return pd.DataFrame(columns=["snapshot_date", "sla_met", "sla_denominator", "sla_rate"])
+    df["sla_met"] = pd.to_numeric(df["TechCleared_MetSLA_Boolean"], errors="coerce").fillna(0)
+    df["sla_denominator"] = pd.to_numeric(df["Include_SLA_Denominator"], errors="coerce").fillna(0)
+    per_snapshot = df.groupby("snapshot_date")[["sla_met", "sla_denominator"]].sum()
+    per_snapshot.index = pd.to_datetime(per_snapshot.index)
+    trend = per_snapshot.resample(freq).last().dropna()
+    trend["sla_rate"] = trend["sla_met"] / trend["sla_denominator"].where(trend["sla_denominator"] != 0)
+    return trend.reset_index()
+
+
+def compact_partitions(store_name: str) -> None:
+    """Merges partitions holding more than one part file (ex. reruns on the same day) into a single file.
+    Only the latest part is kept since each part is a full snapshot of the same day."""
+    for partition_date in _list_partition_dates(store_name):
+        part_files = _list_part_files(_partition_dir(store_name, partition_date))
+        if len(part_files) > 1:
+            for part_file in part_files[:-1]:
+                os.remove(part_file)
+            logger.info(f"Compacted {len(part_files)} part files in {store_name} snapshot {partition_date}")
+
+
+def apply_retention(store_name: str, retention_days: int = SNAPSHOT_RETENTION_DAYS) -> None:
+    cutoff = _now().date() - timedelta(days=retention_days)
+    for partition_date in _list_partition_dates(store_name):
+        if partition_date < cutoff:
+            shutil.rmtree(_partition_dir(store_name, partition_date))
+            logger.info(f"Removed {store_name} snapshot {partition_date} past {retention_days} day retention")
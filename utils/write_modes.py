@@ -0,0 +1,3 @@
+# "values" writes with Worksheet.set_dataframe; "paste" sends the frame as delimited text in a pasteData request
+WRITE_MODES = ["values", "paste"]
+DEFAULT_WRITE_MODE = "values"